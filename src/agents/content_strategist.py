@@ -1,28 +1,168 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, ValidationError
 from src.models.state_models import OutlineState
 from src.models.content_models import ContentBrief, OutlineSection, FAQ, ContentGap
-import json
+from src.models.content_models_fast import ContentBriefMS
+from src.agents.semantic_cache import cache_enabled, embed, get_cache, match_key
+from typing import List
+from itertools import islice
+from functools import lru_cache
+import asyncio
+import copy
+import hashlib
+import msgspec
+import orjson
+
+# Constants
+MAX_CONCURRENT_LLM_CALLS = 16
+
+# Everything static lives in the system message so every request shares the
+# same prompt prefix (provider-side prompt caching); only {context} varies.
+_SYSTEM_PROMPT = """You are an expert content strategist specializing in SEO-optimized article outlines. 
+    Create a comprehensive, well-structured outline that:
+    
+    1. Targets the primary keyword naturally throughout
+    2. Incorporates secondary and LSI keywords strategically
+    3. Addresses search intent and user needs
+    4. Covers competitor gaps and unique angles
+    5. Includes actionable, specific section titles
+    6. Maps People Also Ask questions to relevant sections or FAQs
+    
+    Focus on creating content that provides genuine value while being optimized for search visibility.
+    
+    REQUIREMENTS:
+    - Create engaging, specific section titles (not generic)
+    - Ensure each section targets relevant keywords naturally
+    - Include practical subsections with actionable information
+    - Address content gaps identified from competitor analysis
+    - Create FAQ section from People Also Ask data
+    - Provide brief research notes for each section
+    
+    {format_instructions}"""
+
+_HUMAN_TEMPLATE = """Based on the following research context, create a detailed content outline:
+    
+    {context}"""
+
+# LangChain objects are built lazily on first use and then shared by the
+# sync and async entry points, keeping the heavy imports off module import.
+@lru_cache(maxsize=1)
+def _get_parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=ContentBrief)
+
+@lru_cache(maxsize=1)
+def _get_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.messages import SystemMessage
+    # The system message is rendered once and passed through untemplated;
+    # only the human message is formatted per call
+    system_message = SystemMessage(content=_SYSTEM_PROMPT.format(
+        format_instructions=_get_parser().get_format_instructions()
+    ))
+    return ChatPromptTemplate.from_messages([
+        system_message,
+        ("human", _HUMAN_TEMPLATE)
+    ])
+
+@lru_cache(maxsize=1)
+def _get_llm():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+
+@lru_cache(maxsize=1)
+def _get_simple_chain():
+    return _get_prompt() | _get_llm()
+
+@lru_cache(maxsize=1)
+def _get_chain():
+    # The Pydantic parser only supplies format instructions; responses are
+    # decoded straight into msgspec structs
+    return _get_simple_chain() | (lambda message: _decode_outline(message.content))
+
+def _decode_outline(raw_content):
+    """Decode and validate an LLM response into ContentBriefMS; raises on invalid output"""
+    json_str = extract_first_json(raw_content) or raw_content
+    # strict=False keeps the lax coercion PydanticOutputParser applied (e.g. "2500" -> 2500)
+    return msgspec.json.decode(json_str, type=ContentBriefMS, strict=False)
+
+def _outline_to_dict(outline):
+    """Plain-dict form of an outline for state; every call returns a fresh tree"""
+    if isinstance(outline, msgspec.Struct):
+        # C-level walk, much cheaper than a Pydantic dump
+        return msgspec.to_builtins(outline)
+    if isinstance(outline, BaseModel):
+        # model_dump directly rather than the deprecated .dict() wrapper
+        return outline.model_dump()
+    return outline
 
 def generate_content_strategy(state: OutlineState) -> OutlineState:
     """Generate comprehensive content strategy and outline"""
     
-    # Extract data from state
-    keywords = state['keywords']
-    content_strategy = state.get('content_strategy', {})
-    competitor_analysis = state.get('competitor_analysis', {})
-    serper_results = state.get('serper_results', [])
-    content_gaps = state.get('content_gaps', [])
-    
     # Build context for LLM
-    context = _build_strategy_context(keywords, content_strategy, competitor_analysis, serper_results, content_gaps)
+    context = _build_strategy_context(*_strategy_inputs(state))
+    
+    # Generate outline using LLM; a blank keyword skips the embedding along with the LLM call
+    context_embedding = _context_embedding(state, context) if _has_primary_keyword(state) else None
+    outline = _generate_outline_with_llm(context, state['keywords'], state.get('content_strategy', {}), context_embedding)
+    
+    return _apply_outline(state, outline)
+
+async def generate_content_strategy_batch(states: List[OutlineState]) -> List[OutlineState]:
+    """Generate outlines for many states concurrently, bounded by MAX_CONCURRENT_LLM_CALLS.
+    
+    States that produce an identical strategy context share a single LLM call;
+    each of them gets its own copy of the resulting outline.
+    """
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
     
-    # Generate outline using LLM
-    outline = _generate_outline_with_llm(context, keywords, content_strategy)
+    # target_audience is not part of the context but shapes the fallback outline,
+    # so it is part of the grouping key
+    groups = {}
+    for state in states:
+        context = _build_strategy_context(*_strategy_inputs(state))
+        target_audience = state.get('content_strategy', {}).get('target_audience')
+        groups.setdefault((context, target_audience), []).append(state)
     
+    async def run_one(context, group):
+        state = group[0]
+        async with semaphore:
+            # encode() and sqlite writes are blocking; keep them off the event loop
+            context_embedding = await asyncio.to_thread(_context_embedding, state, context) if _has_primary_keyword(state) else None
+            outline = await _agenerate_outline_with_llm(context, state['keywords'], state.get('content_strategy', {}), context_embedding)
+        
+        _apply_outline(state, outline)
+        for duplicate in group[1:]:
+            duplicate['context_embedding_key'] = state.get('context_embedding_key')
+            duplicate['context_embedding'] = state.get('context_embedding')
+            # Models are dumped into a fresh dict per state; only plain dicts need copying
+            _apply_outline(duplicate, copy.deepcopy(outline) if isinstance(outline, dict) else outline)
+    
+    results = await asyncio.gather(*[run_one(key[0], g) for key, g in groups.items()], return_exceptions=True)
+    
+    # A failure is recorded on the states of that context only; the rest of the batch is kept
+    for group, result in zip(groups.values(), results):
+        if isinstance(result, Exception):
+            for state in group:
+                state['errors'].append(f"Failed to generate content outline: {result}")
+                state['confidence_scores']['content_strategy'] = 0.3
+    
+    return states
+
+def _strategy_inputs(state):
+    """Extract the inputs _build_strategy_context needs from state"""
+    return (
+        state['keywords'],
+        state.get('content_strategy', {}),
+        state.get('competitor_analysis', {}),
+        state.get('serper_results', []),
+        state.get('content_gaps', []),
+    )
+
+def _apply_outline(state, outline):
+    """Store a generated outline (or the failure) on state"""
     if outline:
-        state['outline'] = outline.dict() if hasattr(outline, 'dict') else outline
+        state['outline'] = _outline_to_dict(outline)
         state['confidence_scores']['content_strategy'] = 0.9
     else:
         state['errors'].append("Failed to generate content outline")
@@ -30,138 +170,277 @@ def generate_content_strategy(state: OutlineState) -> OutlineState:
     
     return state
 
+def _primary_keyword(keywords):
+    """Primary keyword from either a dict or a keyword object"""
+    if isinstance(keywords, dict):
+        return keywords.get('primary', '') or ''
+    return keywords.primary or ''
+
+def _has_primary_keyword(state):
+    return bool(_primary_keyword(state['keywords']).strip())
+
 def _build_strategy_context(keywords, content_strategy, competitor_analysis, serper_results, content_gaps):
     """Build comprehensive context for strategy generation"""
     
-    context_parts = []
-    
     # Handle both dict and KeywordData object formats
     if isinstance(keywords, dict):
         primary_keyword = keywords.get('primary', '')
         secondary_keywords = keywords.get('secondary', [])
         lsi_keywords = keywords.get('lsi', [])
-        longtail_keywords =None
     else:
-        # KeywordData object
         primary_keyword = keywords.primary
         secondary_keywords = keywords.secondary
         lsi_keywords = keywords.lsi
-        longtail_keywords = None
-    
-    # Keywords context
-    context_parts.append(f"PRIMARY KEYWORD: {primary_keyword}")
-    if secondary_keywords:
-        context_parts.append(f"SECONDARY KEYWORDS: {', '.join(secondary_keywords)}")
-    if lsi_keywords:
-        context_parts.append(f"LSI KEYWORDS: {', '.join(lsi_keywords)}")
-    if longtail_keywords:
-        context_parts.append(f"LONGTAIL KEYWORDS: {', '.join(longtail_keywords)}")
-    
-    # Rest of the function remains the same
-    context_parts.append(f"CONTENT TYPE: {content_strategy.get('content_type', 'guide')}")
-    context_parts.append(f"SEARCH INTENT: {content_strategy.get('search_intent', 'informational')}")
-    context_parts.append(f"TARGET WORD COUNT: {content_strategy.get('estimated_word_count', 2500)}")
-    
-    # Competitor insights
-    if competitor_analysis.get('common_topics'):
-        context_parts.append(f"COMPETITOR TOPICS: {', '.join(competitor_analysis['common_topics'][:10])}")
-    
-    # PAA questions
-    if serper_results:
-        paa_questions = [paa.get('question', '') for paa in serper_results[0].get('people_also_ask', [])][:5]
-        if paa_questions:
-            context_parts.append(f"PEOPLE ALSO ASK: {'; '.join(paa_questions)}")
     
-    # Content gaps
-    if content_gaps:
-        gap_topics = [gap.get('topic', '') for gap in content_gaps[:3]]
-        context_parts.append(f"CONTENT GAPS TO ADDRESS: {'; '.join(gap_topics)}")
-    
-    return "\n".join(context_parts)
+    # Reduce the inputs to a hashable key so repeated builds hit the cache
+    return _render_strategy_context(
+        primary_keyword,
+        tuple(secondary_keywords or ()),
+        tuple(lsi_keywords or ()),
+        content_strategy.get('content_type', 'guide'),
+        content_strategy.get('search_intent', 'informational'),
+        content_strategy.get('estimated_word_count', 2500),
+        tuple((competitor_analysis.get('common_topics') or ())[:10]),
+        tuple(_paa_questions(serper_results)),
+        tuple(gap.get('topic', '') for gap in content_gaps[:3]),
+    )
 
+def _paa_questions(serper_results, limit=5):
+    """First `limit` non-empty People Also Ask questions, without materialising the full list"""
+    people_also_ask = serper_results[0].get('people_also_ask', ()) if serper_results else ()
+    return [paa['question'] for paa in islice(people_also_ask, limit) if paa.get('question')]
 
-def _generate_outline_with_llm(context, keywords, content_strategy):
-    """Generate structured outline using LLM with Pydantic parser"""
-    
-    parser = PydanticOutputParser(pydantic_object=ContentBrief)
-    
-    system_prompt = """You are an expert content strategist specializing in SEO-optimized article outlines. 
-    Create a comprehensive, well-structured outline that:
-    
-    1. Targets the primary keyword naturally throughout
-    2. Incorporates secondary and LSI keywords strategically
-    3. Addresses search intent and user needs
-    4. Covers competitor gaps and unique angles
-    5. Includes actionable, specific section titles
-    6. Maps People Also Ask questions to relevant sections or FAQs
+@lru_cache(maxsize=256)
+def _render_strategy_context(primary_keyword, secondary_keywords, lsi_keywords, content_type, search_intent,
+                             word_count, competitor_topics, paa_questions, gap_topics):
+    """Render the strategy context from hashable inputs; memoized since retries and variants repeat them"""
+    return (
+        f"PRIMARY KEYWORD: {primary_keyword}"
+        + (f"\nSECONDARY KEYWORDS: {', '.join(secondary_keywords)}" if secondary_keywords else "")
+        + (f"\nLSI KEYWORDS: {', '.join(lsi_keywords)}" if lsi_keywords else "")
+        + f"\nCONTENT TYPE: {content_type}"
+        f"\nSEARCH INTENT: {search_intent}"
+        f"\nTARGET WORD COUNT: {word_count}"
+        + (f"\nCOMPETITOR TOPICS: {', '.join(competitor_topics)}" if competitor_topics else "")
+        + (f"\nPEOPLE ALSO ASK: {'; '.join(paa_questions)}" if paa_questions else "")
+        + (f"\nCONTENT GAPS TO ADDRESS: {'; '.join(gap_topics)}" if gap_topics else "")
+    )
+
+
+def _construct_brief(data):
+    """Rebuild a ContentBrief from a trusted dict without re-running validation.
     
-    Focus on creating content that provides genuine value while being optimized for search visibility."""
+    Only for data that has already been validated once: cache entries are
+    written from outlines _decode_outline accepted. Fresh LLM output is
+    validated when _decode_outline decodes it into ContentBriefMS.
+    """
+    return ContentBrief.model_construct(**{
+        **data,
+        "sections": [OutlineSection.model_construct(**s) for s in data.get("sections", [])],
+        "faqs": [FAQ.model_construct(**f) for f in data.get("faqs", [])],
+        "content_gaps_addressed": [ContentGap.model_construct(**g) for g in data.get("content_gaps_addressed", [])],
+    })
+
+
+def _context_hash(context):
+    return hashlib.blake2b(context.encode(), digest_size=16).hexdigest()
+
+
+def _context_embedding(state, context):
+    """Embedding of the strategy context, shared through state['context_embedding']
     
-    human_template = """Based on the following research context, create a detailed content outline:
+    Reused when state already holds an embedding for the same context
+    (state['context_embedding_key']); stored as a list so state stays JSON-serializable.
+    """
+    embedding_key = _context_hash(context)
+    if state.get('context_embedding_key') == embedding_key and state.get('context_embedding') is not None:
+        return state['context_embedding']
+    if not cache_enabled():
+        return None
+    try:
+        context_embedding = embed(context).tolist()
+    except Exception:
+        # Embedding is best-effort; without it the cache is skipped
+        return None
+    state['context_embedding_key'] = embedding_key
+    state['context_embedding'] = context_embedding
+    return context_embedding
+
+
+def _cache_match_key(keywords, content_strategy):
+    """Fields a cache hit must match exactly; defaults mirror _build_strategy_context"""
+    return match_key(
+        _primary_keyword(keywords),
+        content_strategy.get('content_type', 'guide'),
+        content_strategy.get('search_intent', 'informational'),
+        content_strategy.get('estimated_word_count', 2500),
+    )
+
+
+def _lookup_cached_outline(context_embedding, keywords, content_strategy):
+    if context_embedding is None:
+        return None
+    try:
+        cached = get_cache().lookup(context_embedding, _cache_match_key(keywords, content_strategy))
+        return _construct_brief(cached) if cached else None
+    except Exception:
+        # Caching is best-effort; fall through to the LLM
+        return None
+
+
+def _cache_outline(context_embedding, keywords, content_strategy, outline):
+    if context_embedding is None:
+        return
+    try:
+        get_cache().insert(context_embedding, _cache_match_key(keywords, content_strategy), _outline_to_dict(outline))
+    except Exception:
+        pass
+
+
+def _generate_outline_with_llm(context, keywords, content_strategy, context_embedding=None):
+    """Generate structured outline using LLM, decoded into ContentBriefMS"""
     
-    {context}
+    # Nothing worth spending an LLM call on
+    if not _primary_keyword(keywords).strip():
+        return _build_fallback_outline(keywords, content_strategy)
     
-    REQUIREMENTS:
-    - Create engaging, specific section titles (not generic)
-    - Ensure each section targets relevant keywords naturally
-    - Include practical subsections with actionable information
-    - Address content gaps identified from competitor analysis
-    - Create FAQ section from People Also Ask data
-    - Provide brief research notes for each section
+    # Semantic cache: near-identical briefs reuse a previously generated outline
+    cached = _lookup_cached_outline(context_embedding, keywords, content_strategy)
+    if cached:
+        return cached
     
-    {format_instructions}"""
+    try:
+        result = _get_chain().invoke({"context": context})
+        
+        _cache_outline(context_embedding, keywords, content_strategy, result)
+        return result
+        
+    except Exception as e:
+        # Fallback: try without parser
+        try:
+            scanner = JsonObjectScanner()
+            json_str = None
+            # Stop reading as soon as the first top-level JSON object is complete
+            for chunk in _get_simple_chain().stream({"context": context}):
+                json_str = scanner.feed(chunk.content)
+                if json_str is not None:
+                    break
+            
+            # Attempt to parse manually; the scanner already isolated the object
+            return _parse_outline_json(json_str, keywords, content_strategy)
+            
+        except Exception as fallback_error:
+            return None
+
+
+async def _agenerate_outline_with_llm(context, keywords, content_strategy, context_embedding=None):
+    """Async counterpart of _generate_outline_with_llm for batched generation"""
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", human_template)
-    ])
+    if not _primary_keyword(keywords).strip():
+        return _build_fallback_outline(keywords, content_strategy)
     
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+    cached = await asyncio.to_thread(_lookup_cached_outline, context_embedding, keywords, content_strategy)
+    if cached:
+        return cached
     
     try:
-        chain = prompt | llm | parser
-        
-        result = chain.invoke({
-            "context": context,
-            "format_instructions": parser.get_format_instructions()
-        })
+        result = await _get_chain().ainvoke({"context": context})
         
+        await asyncio.to_thread(_cache_outline, context_embedding, keywords, content_strategy, result)
         return result
         
     except Exception as e:
-        # Fallback: try without parser
         try:
-            simple_chain = prompt | llm
-            raw_result = simple_chain.invoke({
-                "context": context,
-                "format_instructions": parser.get_format_instructions()
-            })
+            scanner = JsonObjectScanner()
+            json_str = None
+            async for chunk in _get_simple_chain().astream({"context": context}):
+                json_str = scanner.feed(chunk.content)
+                if json_str is not None:
+                    break
             
-            # Attempt to parse manually
-            return _parse_outline_manually(raw_result.content, keywords, content_strategy)
+            return _parse_outline_json(json_str, keywords, content_strategy)
             
         except Exception as fallback_error:
             return None
 
-def _parse_outline_manually(raw_content, keywords, content_strategy):
-    """Fallback manual parsing if Pydantic parser fails"""
+class JsonObjectScanner:
+    """Incrementally finds the first complete top-level JSON object in streamed text.
+    
+    Tracks brace depth, string state and escapes in a single O(n) pass: each
+    chunk is scanned once and the chunks are only joined when the outermost
+    brace closes, so parsing can start as soon as the object is complete.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk):
+        """Append a chunk; return the JSON object string once it is balanced, else None"""
+        self._chunks.append(chunk)
+        offset = self._offset
+        self._offset += len(chunk)
+        
+        for i, ch in enumerate(chunk):
+            if self._start < 0:
+                if ch == '{':
+                    self._start = offset + i
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    return "".join(self._chunks)[self._start:offset + i + 1]
+        
+        return None
+
+
+def extract_first_json(text):
+    """Return the first balanced top-level JSON object in text, or None"""
+    return JsonObjectScanner().feed(text)
+
+
+def _parse_outline_json(json_str, keywords, content_strategy):
+    """Parse an already-extracted JSON object, falling back to a minimal outline"""
     
     # This is a simplified fallback - in production, you'd want more robust parsing
     try:
-        # Try to extract JSON from the raw content
-        import re
-        json_match = re.search(r'\{.*\}', raw_content, re.DOTALL)
-        if json_match:
-            json_str = json_match.group()
-            parsed = json.loads(json_str)
-            return parsed
+        if json_str:
+            parsed = orjson.loads(json_str)
+            # This JSON already failed _decode_outline, so it is validated
+            # rather than trusted; anything that doesn't fit is kept as the raw dict
+            try:
+                return ContentBrief.model_validate(parsed)
+            except ValidationError:
+                return parsed
     except:
         pass
     
-    # Create minimal fallback outline
+    return _build_fallback_outline(keywords, content_strategy)
+
+def _build_fallback_outline(keywords, content_strategy):
+    """Create minimal fallback outline"""
+    
+    primary = _primary_keyword(keywords)
     return {
-        "title": f"Complete Guide to {keywords.primary.title()}",
-        "meta_description": f"Discover everything about {keywords.primary}. Expert insights and recommendations.",
+        "title": f"Complete Guide to {primary.title()}",
+        "meta_description": f"Discover everything about {primary}. Expert insights and recommendations.",
         "content_type": content_strategy.get('content_type', 'ultimate_guide'),
         "search_intent": content_strategy.get('search_intent', 'informational'),
         "target_audience": content_strategy.get('target_audience', 'general audience'),
@@ -169,9 +448,9 @@ def _parse_outline_manually(raw_content, keywords, content_strategy):
         "sections": [
             {
                 "section_id": "introduction",
-                "section_title": f"What is {keywords.primary.title()}?",
+                "section_title": f"What is {primary.title()}?",
                 "short_description": "Introduction and overview",
-                "target_keywords": [keywords.primary],
+                "target_keywords": [primary],
                 "suggested_word_count": 300,
                 "subsections": ["Overview", "Key Benefits"],
                 "research_notes": ["Define the topic clearly"]
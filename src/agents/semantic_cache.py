@@ -0,0 +1,215 @@
+# semantic_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Constants
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.92
+MAX_ENTRIES = 1000
+SCHEMA_VERSION = 2
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CACHE_PATH = os.getenv("OUTLINE_CACHE_PATH", str(PROJECT_ROOT / ".outline_cache.sqlite3"))
+CACHE_DISABLED = os.getenv("OUTLINE_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Set once the model or the cache file fails to load, so the rest of the
+# process skips caching instead of retrying the load on every request
+_disabled = CACHE_DISABLED
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+class CacheDisabledError(RuntimeError):
+    pass
+
+
+def cache_enabled() -> bool:
+    return not _disabled
+
+
+def _disable():
+    global _disabled
+    _disabled = True
+
+
+def _get_embedder():
+    """Load the sentence-transformer once; it is only needed when caching is used."""
+    global _embedder
+    with _embedder_lock:
+        if _disabled:
+            raise CacheDisabledError("semantic cache is disabled")
+        if _embedder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(EMBEDDING_MODEL)
+            except Exception:
+                _disable()
+                raise
+    return _embedder
+
+
+def embed(text: str) -> np.ndarray:
+    """Unit-normalised embedding of the prompt context."""
+    return _get_embedder().encode(text, normalize_embeddings=True)
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / denom if denom else 0.0
+
+
+def match_key(primary_keyword: str, content_type: Any, search_intent: Any, word_count: Any) -> str:
+    """Exact-match key a cache hit must share, on top of embedding similarity.
+
+    These fields differ by a token or two in the context, which barely moves
+    the embedding but changes what the outline must look like.
+    """
+    normalized_keyword = " ".join((primary_keyword or "").lower().split())
+    return json.dumps([normalized_keyword, str(content_type), str(search_intent), str(word_count)])
+
+
+class SemanticCache:
+    """Clustered prompt-embedding cache for generated outlines.
+
+    Each cluster keeps a running centroid and its entries, so a lookup only
+    compares against centroids before scanning the closest cluster. A hit also
+    requires the same match_key (primary keyword, content type, search intent,
+    word count), since contexts that differ only in those embed very close
+    together.
+
+    Entries are stored in sqlite one row at a time (outlines as JSON); only
+    embeddings and match keys are held in memory. Once MAX_ENTRIES is exceeded
+    the oldest entries are evicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # cluster_id -> {"centroid": array, "entries": [(entry_id, embedding, match_key)]}
+        self.clusters: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Entries from older schemas lack the full match key; start over
+            self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, cluster_id INTEGER NOT NULL, "
+            "match_key TEXT NOT NULL, embedding BLOB NOT NULL, outline TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT id, cluster_id, match_key, embedding FROM entries ORDER BY id"
+        ).fetchall()
+        for entry_id, cluster_id, key, blob in rows:
+            self._add_to_cluster(cluster_id, (entry_id, np.frombuffer(blob, dtype=np.float32), key))
+
+    def __len__(self):
+        return sum(len(cluster["entries"]) for cluster in self.clusters.values())
+
+    def _add_to_cluster(self, cluster_id: int, entry: Tuple[int, np.ndarray, str]):
+        embedding = entry[1]
+        cluster = self.clusters.setdefault(cluster_id, {"centroid": embedding.copy(), "entries": []})
+        cluster["entries"].append(entry)
+        # Incremental mean: c <- c + (e - c) / n
+        n = len(cluster["entries"])
+        cluster["centroid"] = cluster["centroid"] + (embedding - cluster["centroid"]) / n
+
+    def _remove_from_cluster(self, cluster_id: int, entry_id: int):
+        cluster = self.clusters[cluster_id]
+        n = len(cluster["entries"])
+        if n == 1:
+            del self.clusters[cluster_id]
+            return
+        index = next(i for i, entry in enumerate(cluster["entries"]) if entry[0] == entry_id)
+        _, embedding, _ = cluster["entries"].pop(index)
+        # Inverse of the incremental mean: c <- (n * c - e) / (n - 1)
+        cluster["centroid"] = (n * cluster["centroid"] - embedding) / (n - 1)
+
+    def _nearest_cluster(self, embedding: np.ndarray) -> Tuple[Optional[int], float]:
+        best_id, best_sim = None, -1.0
+        for cluster_id, cluster in self.clusters.items():
+            sim = _cosine(embedding, cluster["centroid"])
+            if sim > best_sim:
+                best_id, best_sim = cluster_id, sim
+        return best_id, best_sim
+
+    def lookup(self, embedding: np.ndarray, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached outline closest to `embedding` with the same match key, if similar enough."""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            cluster_id, sim = self._nearest_cluster(embedding)
+            if cluster_id is None or sim < self.threshold:
+                return None
+
+            best_id, best_sim = None, self.threshold
+            for entry_id, entry_embedding, entry_key in self.clusters[cluster_id]["entries"]:
+                if entry_key != key:
+                    continue
+                entry_sim = _cosine(embedding, entry_embedding)
+                if entry_sim >= best_sim:
+                    best_id, best_sim = entry_id, entry_sim
+            if best_id is None:
+                return None
+
+            row = self._conn.execute("SELECT outline FROM entries WHERE id = ?", (best_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, embedding: np.ndarray, key: str, outline: Dict[str, Any]):
+        """Add an outline to its nearest cluster (or a new one), persisting only the new row."""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            cluster_id, sim = self._nearest_cluster(embedding)
+            if cluster_id is None or sim < self.threshold:
+                cluster_id = max(self.clusters, default=-1) + 1
+
+            cursor = self._conn.execute(
+                "INSERT INTO entries (cluster_id, match_key, embedding, outline) VALUES (?, ?, ?, ?)",
+                (cluster_id, key, embedding.tobytes(), json.dumps(outline)),
+            )
+            self._add_to_cluster(cluster_id, (cursor.lastrowid, embedding, key))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the oldest entries beyond max_entries"""
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return
+        rows = self._conn.execute(
+            "SELECT id, cluster_id FROM entries ORDER BY id LIMIT ?", (overflow,)
+        ).fetchall()
+        for entry_id, cluster_id in rows:
+            self._remove_from_cluster(cluster_id, entry_id)
+        self._conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id, _ in rows])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SemanticCache:
+    global _cache
+    with _cache_lock:
+        if _disabled:
+            raise CacheDisabledError("semantic cache is disabled")
+        if _cache is None:
+            try:
+                _cache = SemanticCache()
+            except Exception:
+                _disable()
+                raise
+    return _cache
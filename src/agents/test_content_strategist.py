@@ -1,4 +1,6 @@
 # src/agents/test_content_strategy.py
+import asyncio
+import json
 import os
 import sys
 
@@ -7,7 +9,13 @@ from dotenv import load_dotenv
 load_dotenv()  # expects OPENAI_API_KEY for ChatOpenAI
 
 # Import the function under test
-from src.agents.content_strategist import generate_content_strategy
+from src.agents import content_strategist
+from src.agents.content_strategist import (
+    generate_content_strategy, generate_content_strategy_batch, JsonObjectScanner, extract_first_json
+)
+from src.models.content_models_fast import ContentBriefMS
+import msgspec
+import pytest
 
 # Optional: import your models if needed to build nicer objects
 # from src.models.state_models import OutlineState, Keywords
@@ -99,5 +107,155 @@ def main():
     if errs:
         print("Errors:", errs)
 
+# --- Offline tests (pytest) ---
+
+def test_extract_first_json_returns_first_balanced_object():
+    text = 'Here you go: {"a": {"b": 1}} and also {"c": 2}'
+    assert extract_first_json(text) == '{"a": {"b": 1}}'
+
+def test_extract_first_json_ignores_braces_and_escaped_quotes_in_strings():
+    text = '{"title": "Use {braces} and \\"quotes}\\"", "n": 1}'
+    assert extract_first_json(text) == text
+
+def test_extract_first_json_unbalanced_input_returns_none():
+    assert extract_first_json('{"a": {"b": 1}') is None
+    assert extract_first_json("no json here") is None
+
+def test_scanner_returns_object_once_chunks_balance():
+    scanner = JsonObjectScanner()
+    chunks = ['```json\n{"a"', ': "x}', '\\"', '", "b": {', '}}']
+    results = [scanner.feed(chunk) for chunk in chunks]
+    assert results[:4] == [None, None, None, None]
+    assert results[4] == '{"a": "x}\\"", "b": {}}'
+
+def make_outline_json(**overrides):
+    outline = {
+        "title": "AI in Healthcare Guide",
+        "meta_description": "Everything about AI in healthcare.",
+        "content_type": "ultimate_guide",
+        "search_intent": "informational",
+        "target_audience": "clinicians",
+        "total_word_count": 2500,
+        "sections": [{
+            "section_id": "intro",
+            "section_title": "What is AI in healthcare?",
+            "short_description": "Overview",
+            "target_keywords": ["AI in healthcare"],
+            "suggested_word_count": 300,
+        }],
+        "faqs": [],
+        "content_gaps_addressed": [],
+    }
+    outline.update(overrides)
+    return json.dumps(outline)
+
+@pytest.mark.parametrize("word_count", ["2500", 2500.0])
+def test_decode_outline_coerces_numeric_values_like_pydantic(word_count):
+    outline = content_strategist._decode_outline(make_outline_json(total_word_count=word_count))
+    assert outline.total_word_count == 2500
+
+@pytest.mark.parametrize("overrides", [
+    {"total_word_count": 2500.5},
+    {"content_type": "guide"},
+    {"sections": [{
+        "section_id": "intro",
+        "section_title": "Intro",
+        "short_description": "Overview",
+        "target_keywords": [],
+        "suggested_word_count": 50,
+    }]},
+])
+def test_decode_outline_rejects_values_pydantic_rejects(overrides):
+    with pytest.raises(msgspec.ValidationError):
+        content_strategist._decode_outline(make_outline_json(**overrides))
+
+def test_decode_outline_reads_json_inside_markdown_fence():
+    raw = "Here is the outline:\n```json\n" + make_outline_json() + "\n```"
+    outline = content_strategist._decode_outline(raw)
+    assert outline.title == "AI in Healthcare Guide"
+    assert outline.sections[0].suggested_word_count == 300
+
+class StubChain:
+    """Stands in for the LLM chain; records the contexts it is called with"""
+    
+    def __init__(self):
+        self.contexts = []
+    
+    async def ainvoke(self, inputs):
+        self.contexts.append(inputs["context"])
+        return ContentBriefMS(
+            title="Stub outline",
+            meta_description="",
+            content_type="ultimate_guide",
+            search_intent="informational",
+            target_audience="stub",
+            total_word_count=1000,
+            sections=[],
+            faqs=[],
+            content_gaps_addressed=[],
+        )
+
+def make_batch_state(primary, target_audience="general audience"):
+    state = make_outline_state()
+    state["keywords"] = {"primary": primary, "secondary": [], "lsi": []}
+    state["content_strategy"] = dict(state["content_strategy"], target_audience=target_audience)
+    return state
+
+def run_batch(monkeypatch, states, chain=None):
+    chain = chain or StubChain()
+    monkeypatch.setattr(content_strategist, "_get_chain", lambda: chain)
+    monkeypatch.setattr(content_strategist, "_context_embedding", lambda state, context: None)
+    return chain, asyncio.run(generate_content_strategy_batch(states))
+
+def test_batch_deduplicates_identical_contexts(monkeypatch):
+    states = [make_batch_state("AI in healthcare"), make_batch_state("AI in healthcare"), make_batch_state("AI in finance")]
+    chain, results = run_batch(monkeypatch, states)
+    
+    assert len(chain.contexts) == 2
+    assert results[0]["outline"] == results[1]["outline"]
+    # Duplicates get their own copy, not a shared dict
+    assert results[0]["outline"] is not results[1]["outline"]
+    assert all(r["confidence_scores"]["content_strategy"] == 0.9 for r in results)
+
+def test_batch_keeps_states_with_different_audiences_apart(monkeypatch):
+    states = [make_batch_state("AI in healthcare", "doctors"), make_batch_state("AI in healthcare", "patients")]
+    chain, _ = run_batch(monkeypatch, states)
+    
+    assert len(chain.contexts) == 2
+
+def test_batch_records_errors_on_every_state_of_failing_group(monkeypatch):
+    original = content_strategist._agenerate_outline_with_llm
+    
+    async def failing(context, keywords, content_strategy, context_embedding=None):
+        if keywords["primary"] == "boom":
+            raise RuntimeError("provider down")
+        return await original(context, keywords, content_strategy, context_embedding)
+    
+    monkeypatch.setattr(content_strategist, "_agenerate_outline_with_llm", failing)
+    states = [make_batch_state("boom"), make_batch_state("boom"), make_batch_state("AI in healthcare")]
+    _, results = run_batch(monkeypatch, states)
+    
+    for failed in results[:2]:
+        assert "outline" not in failed
+        assert failed["errors"] == ["Failed to generate content outline: provider down"]
+        assert failed["confidence_scores"]["content_strategy"] == 0.3
+    assert results[2]["outline"]["title"] == "Stub outline"
+    assert results[2]["errors"] == []
+
+def test_blank_primary_keyword_skips_llm_and_embedding(monkeypatch):
+    def must_not_run(*args, **kwargs):
+        raise AssertionError("LLM or embedder called for a blank keyword")
+    
+    monkeypatch.setattr(content_strategist, "_get_chain", must_not_run)
+    monkeypatch.setattr(content_strategist, "_context_embedding", must_not_run)
+    state = make_outline_state()
+    state["keywords"] = {"primary": "  "}
+    
+    result = generate_content_strategy(state)
+    
+    assert result["outline"] == content_strategist._build_fallback_outline(state["keywords"], state["content_strategy"])
+    assert result["confidence_scores"]["content_strategy"] == 0.9
+    assert "context_embedding" not in result
+
 if __name__ == "__main__":
     main()
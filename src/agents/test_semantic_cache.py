@@ -0,0 +1,101 @@
+# src/agents/test_semantic_cache.py
+
+import numpy as np
+import pytest
+
+from src.agents import semantic_cache
+from src.agents.semantic_cache import CacheDisabledError, SemanticCache, match_key
+
+
+def key(primary, content_type="ultimate_guide", search_intent="informational", word_count=2500):
+    return match_key(primary, content_type, search_intent, word_count)
+
+
+def make_cache(tmp_path, **kwargs):
+    return SemanticCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_hit_requires_similar_embedding(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.insert(np.array([1.0, 0.0, 0.0]), key("AI in healthcare"), {"title": "AI guide"})
+
+    assert cache.lookup(np.array([1.0, 0.01, 0.0]), key("AI in healthcare")) == {"title": "AI guide"}
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), key("AI in healthcare")) is None
+
+
+def test_hit_rejects_different_primary_keyword(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.insert(np.array([1.0, 0.0, 0.0]), key("best running shoes"), {"title": "Running"})
+
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("best trail running shoes")) is None
+    # Keyword matching ignores case and extra whitespace
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("  Best Running  shoes")) == {"title": "Running"}
+
+
+def test_hit_rejects_different_content_type(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.insert(np.array([1.0, 0.0, 0.0]), key("AI in healthcare", content_type="how_to"), {"title": "How to"})
+
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("AI in healthcare", content_type="listicle")) is None
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("AI in healthcare", word_count=1500)) is None
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("AI in healthcare", content_type="how_to")) == {"title": "How to"}
+
+
+def test_centroid_is_running_mean_of_cluster(tmp_path):
+    cache = make_cache(tmp_path, threshold=0.9)
+    a = np.array([1.0, 0.0], dtype=np.float32)
+    b = np.array([1.0, 0.2], dtype=np.float32)
+    cache.insert(a, key("kw"), {"n": 1})
+    cache.insert(b, key("kw"), {"n": 2})
+
+    assert len(cache.clusters) == 1
+    centroid = next(iter(cache.clusters.values()))["centroid"]
+    np.testing.assert_allclose(centroid, (a + b) / 2, rtol=1e-6)
+
+
+def test_dissimilar_embedding_starts_new_cluster(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.insert(np.array([1.0, 0.0]), key("kw"), {"n": 1})
+    cache.insert(np.array([0.0, 1.0]), key("kw"), {"n": 2})
+
+    assert len(cache.clusters) == 2
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.insert(np.array([1.0, 0.0, 0.0]), key("a"), {"n": 1})
+    cache.insert(np.array([0.0, 1.0, 0.0]), key("b"), {"n": 2})
+    cache.insert(np.array([0.0, 0.0, 1.0]), key("c"), {"n": 3})
+
+    assert len(cache) == 2
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), key("a")) is None
+    assert cache.lookup(np.array([0.0, 0.0, 1.0]), key("c")) == {"n": 3}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    make_cache(tmp_path).insert(np.array([1.0, 0.0]), key("kw"), {"title": "saved"})
+
+    reloaded = make_cache(tmp_path)
+    assert reloaded.lookup(np.array([1.0, 0.0]), key("kw")) == {"title": "saved"}
+
+
+def test_failed_cache_open_disables_cache_for_the_process(monkeypatch):
+    attempts = []
+
+    def failing_cache():
+        attempts.append(1)
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(semantic_cache, "_disabled", False)
+    monkeypatch.setattr(semantic_cache, "_cache", None)
+    monkeypatch.setattr(semantic_cache, "SemanticCache", failing_cache)
+
+    with pytest.raises(OSError):
+        semantic_cache.get_cache()
+    with pytest.raises(CacheDisabledError):
+        semantic_cache.get_cache()
+    with pytest.raises(CacheDisabledError):
+        semantic_cache.embed("context")
+
+    assert len(attempts) == 1
+    assert not semantic_cache.cache_enabled()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Tuple, Literal
 from enum import Enum
 
 class ContentTypeSearchIntent(BaseModel):
@@ -19,6 +19,11 @@ class SearchIntent(str, Enum):
     TRANSACTIONAL = "transactional"
     NAVIGATIONAL = "navigational"
 
+# Literal equivalents of the enums above, used as ContentBrief field types
+# (cheaper to validate than Enum fields). Keep in sync with the enums.
+ContentTypeValue = Literal["ultimate_guide", "how_to", "comparison", "listicle", "review"]
+SearchIntentValue = Literal["informational", "commercial", "transactional", "navigational"]
+
 class KeywordData(BaseModel):
     primary: str
     secondary: List[str] = []
@@ -47,20 +52,11 @@ class FAQ(BaseModel):
 class ContentBrief(BaseModel):
     title: str
     meta_description: str
-    content_type: ContentType
-    search_intent: SearchIntent
+    content_type: ContentTypeValue
+    search_intent: SearchIntentValue
     target_audience: str
     total_word_count: int
     sections: List[OutlineSection]
     faqs: List[FAQ]
     content_gaps_addressed: List[ContentGap]
     internal_link_opportunities: List[str] = []
-    
-    @field_validator('title')
-    @classmethod
-    def title_must_contain_primary_keyword(cls, v, values):
-        if 'target_keywords' in values and values['target_keywords']:
-            primary = values['target_keywords'][0].lower()
-            if primary not in v.lower():
-                raise ValueError(f"Title should contain primary keyword: {primary}")
-        return v
@@ -0,0 +1,38 @@
+import msgspec
+from typing import List, Annotated
+from .content_models import ContentTypeValue, SearchIntentValue
+
+# msgspec mirrors of the ContentBrief models in content_models.py, used to
+# decode LLM output and serialize it into the state dict. Field names,
+# defaults and bounds must stay in sync with the Pydantic versions.
+
+class ContentGapMS(msgspec.Struct):
+    topic: str
+    description: str
+    opportunity_score: Annotated[int, msgspec.Meta(ge=1, le=10)]
+
+class OutlineSectionMS(msgspec.Struct):
+    section_id: str
+    section_title: str
+    short_description: str
+    target_keywords: List[str]
+    suggested_word_count: Annotated[int, msgspec.Meta(ge=100, le=2000)]
+    subsections: List[str] = []
+    research_notes: List[str] = []
+
+class FAQMS(msgspec.Struct):
+    question: str
+    answer_brief: str
+    target_keywords: List[str] = []
+
+class ContentBriefMS(msgspec.Struct):
+    title: str
+    meta_description: str
+    content_type: ContentTypeValue
+    search_intent: SearchIntentValue
+    target_audience: str
+    total_word_count: int
+    sections: List[OutlineSectionMS]
+    faqs: List[FAQMS]
+    content_gaps_addressed: List[ContentGapMS]
+    internal_link_opportunities: List[str] = []
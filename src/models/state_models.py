@@ -13,6 +13,8 @@ class OutlineState(TypedDict):
     serper_results: List[Dict[str, Any]]
     competitor_analysis: Dict[str,Any]
     research_context : str
+    context_embedding: Optional[List[float]]
+    context_embedding_key: Optional[str]
 
     content_gaps: List[Dict[str, Any]]
 
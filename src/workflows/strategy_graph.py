@@ -33,6 +33,8 @@ def create_initial_state(topic=None, keywords=None, word_count=2500):
         'word_count_range': f"{word_count-300}-{word_count+300}",
         'competitor_analysis': {},
         'research_context': '',
+        'context_embedding': None,
+        'context_embedding_key': None,
         'content_gaps': [],
         'content_strategy': {},
         'outline': {},